@@ -1,32 +1,91 @@
+import asyncio
 import base64
+import hashlib
+import random
+import time
 import urllib
 import urllib.parse
+import weakref
 import logging
 import json
 import aiohttp
+import orjson
 from base64 import b64encode
 from msgraph_async.common.constants import *
 from msgraph_async.common.exceptions import *
 from msgraph_async.common.odata_query import *
-from datetime import datetime, timedelta
-from apscheduler.schedulers.asyncio import AsyncIOScheduler
+from collections import defaultdict, namedtuple
+from datetime import datetime, timedelta, timezone
+from email.utils import parsedate_to_datetime
 from typing import List
 
 from functools import wraps
 
+from aiohttp.resolver import AsyncResolver
+
+try:
+    import httpx
+except ImportError:
+    httpx = None
+
+try:
+    import h2
+except ImportError:
+    h2 = None
+
+try:
+    import aiodns
+except ImportError:
+    aiodns = None
+
+_CachedToken = namedtuple("_CachedToken", ["content", "expires_at"])
+
+# tokens acquired by tenant id, shared between all clients, keyed by (base url, app id, tenant id, secret hash)
+_TOKEN_CACHE = {}
+# asyncio locks can't be shared between event loops, so each running loop gets its own locks
+_TOKEN_LOCKS = weakref.WeakKeyDictionary()
+
+
+def _get_token_lock(key) -> asyncio.Lock:
+    loop = asyncio.get_running_loop()
+    locks = _TOKEN_LOCKS.get(loop)
+    if locks is None:
+        locks = _TOKEN_LOCKS[loop] = defaultdict(asyncio.Lock)
+    return locks[key]
+
+# failures to connect, nothing was sent so the request is retried whatever its method is
+_CONNECT_ERRORS = (aiohttp.ClientConnectorError,)
+# the connection dropped, possibly after the request was sent, so only idempotent requests are retried
+_DISCONNECT_ERRORS = (aiohttp.ServerDisconnectedError, aiohttp.ClientOSError)
+if httpx:
+    _CONNECT_ERRORS += (httpx.ConnectError,)
+    _DISCONNECT_ERRORS += (httpx.RemoteProtocolError,)
+
 
 def authorized(func):
     @wraps(func)
     def actual(*args, **kwargs):
         client: GraphAdminClient = args[0]
-        if not client._token and not kwargs.get("token"):
+        token = kwargs.get("token")
+        extra_headers = kwargs.get("extra_headers")
+        if not token and not extra_headers and client._base_headers:
+            # headers of the managed token are built once per token, they are shared so never mutate them
+            kwargs["_req_headers"] = client._base_headers
+            return func(*args, **kwargs)
+
+        if token and "_req_headers" in kwargs:
+            # already built from the same kwargs by the calling method (e.g. list_all_* requesting the next pages)
+            return func(*args, **kwargs)
+
+        if token:
+            req_headers = client._build_request_headers(token)
+        elif client._base_headers:
+            req_headers = client._base_headers
+        else:
             raise Exception('Token is not managed so you must explicitly provide it')
-
-        token = kwargs["token"] if kwargs.get("token") else client._token
-        kwargs["_req_headers"]: dict = client._build_auth_header(token)
-        kwargs["_req_headers"].update({"Content-type": "application/json"})
-        if kwargs.get("extra_headers"):
-            kwargs["_req_headers"].update(kwargs["extra_headers"])
+        if extra_headers:
+            req_headers = {**req_headers, **extra_headers}
+        kwargs["_req_headers"] = req_headers
         return func(*args, **kwargs)
 
     return actual
@@ -34,14 +93,26 @@ def authorized(func):
 
 class GraphAdminClient:
 
-    def __init__(self, enable_logging=False, mocked_graph_url=None):
+    def __init__(self, enable_logging=False, mocked_graph_url=None, use_shared_cache=True, max_retries=3,
+                 use_httpx=False):
+        if max_retries < 0:
+            raise ValueError("max retries must not be negative")
+        if use_httpx and not (httpx and h2):
+            raise GraphClientException("use_httpx requires httpx with http2 support (pip install httpx[http2])")
+        self._use_httpx = use_httpx
         self._session = None
+        self._httpx_client = None
         self._token = None
+        self._base_headers = None
+        self._token_expires_at = None
+        self._refresh_lock = None
         self._managed = False
+        self._refresh_task = None
         self._token_refresh_interval_sec = 3300
-        self._scheduler = AsyncIOScheduler()
         self._enable_logging = enable_logging
         self._mocked_graph_url = mocked_graph_url
+        self._use_shared_cache = use_shared_cache
+        self._max_retries = max_retries
 
     @property
     def token_refresh_interval_sec(self):
@@ -62,23 +133,105 @@ class GraphAdminClient:
         return self._token
 
     def _build_url(self, version, resources: typing.List[typing.Tuple], **kwargs):
-        if self._mocked_graph_url:
-            url = self._mocked_graph_url + version
-        else:
-            url = GRAPH_BASE_URL + version
+        parts = [self._mocked_graph_url or GRAPH_BASE_URL, version]
         for resource, resource_id in resources:
-            url += resource
+            parts.append(resource)
             if resource_id:
-                url += f"/{resource_id}"
+                parts.append("/")
+                parts.append(str(resource_id))
 
         odata_query: ODataQuery = kwargs.get("odata_query")
         if odata_query:
-            url += str(odata_query)
+            parts.append(str(odata_query))
 
         if kwargs.get("_value_query_param"):
-            url += "/$value"
+            parts.append("/$value")
+
+        return "".join(parts)
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        await self.close()
+
+    async def close(self):
+        """
+        Close the underlying http session (and stop managing the token),
+        should be called once the client is no longer needed
+        """
+        if self._managed:
+            await self.stop_managing()
+        if self._session:
+            await self._session.close()
+            self._session = None
+        if self._httpx_client:
+            await self._httpx_client.aclose()
+            self._httpx_client = None
+
+    async def _get_session(self) -> aiohttp.ClientSession:
+        # created lazily so the session (and its connection pool) is bound to the running event loop
+        if not self._session:
+            # without aiodns aiohttp resolves in a thread pool, which is still non blocking
+            resolver = AsyncResolver() if aiodns else None
+            connector = aiohttp.TCPConnector(limit=100, limit_per_host=32, keepalive_timeout=75,
+                                             enable_cleanup_closed=True, resolver=resolver, use_dns_cache=True,
+                                             ttl_dns_cache=300)
+            self._session = aiohttp.ClientSession(connector=connector)
+        return self._session
+
+    async def warmup(self):
+        """
+        Resolve and connect to graph (and the login endpoint) ahead of the first requests,
+        so they don't pay for DNS lookups and connection setup. Failures are logged and ignored.
+        """
+        base_urls = [self._mocked_graph_url] if self._mocked_graph_url else [GRAPH_BASE_URL, GRAPH_CONSENT_URL]
+        await asyncio.gather(*[self._open_connection(base_url) for base_url in base_urls])
 
-        return url
+    async def _open_connection(self, url):
+        try:
+            if self._use_httpx:
+                await self._get_httpx_client().get(url)
+            else:
+                session = await self._get_session()
+                async with session.get(url, allow_redirects=False) as resp:
+                    await resp.read()
+        except Exception as e:
+            self._log(logging.WARNING, f"failed to warm up connection to {url}: {str(e)}")
+
+    def _get_httpx_client(self):
+        if not self._httpx_client:
+            limits = httpx.Limits(max_connections=100, max_keepalive_connections=32, keepalive_expiry=75)
+            self._httpx_client = httpx.AsyncClient(http2=True, limits=limits)
+        return self._httpx_client
+
+    async def _send(self, method, url, headers: dict, data: dict or bytes, timeout: int or float):
+        session = await self._get_session()
+        async with session.request(method, url, headers=headers, data=data, timeout=timeout) as resp:
+            if resp.status == HTTPStatus.NO_CONTENT:
+                r = None
+            elif resp.content_type == "application/json":
+                body = await resp.read()
+                r: dict = orjson.loads(body) if body else None
+            else:
+                r: bytes = await resp.read()
+            return r, resp.status, resp.headers
+
+    async def _send_httpx(self, method, url, headers: dict, data: dict or bytes, timeout: int or float):
+        # form data is sent as data and raw bytes as content, same as aiohttp's data handles both
+        body_kwargs = {"data": data} if isinstance(data, dict) else {"content": data}
+        try:
+            resp = await self._get_httpx_client().request(
+                method, url, headers=headers, timeout=timeout or None, **body_kwargs)
+        except httpx.TimeoutException as e:
+            raise asyncio.TimeoutError(str(e)) from e
+        if resp.status_code == HTTPStatus.NO_CONTENT:
+            r = None
+        elif resp.headers.get("content-type", "").split(";")[0].strip().lower() == "application/json":
+            r: dict = orjson.loads(resp.content) if resp.content else None
+        else:
+            r: bytes = resp.content
+        return r, resp.status_code, resp.headers
 
     @staticmethod
     def _build_auth_header(token: str):
@@ -87,14 +240,24 @@ class GraphAdminClient:
         else:
             return {"authorization": f"bearer {token}"}
 
+    @classmethod
+    def _build_request_headers(cls, token: str):
+        headers = cls._build_auth_header(token)
+        headers["Content-type"] = "application/json"
+        return headers
+
+    def _set_token(self, token: str or None):
+        self._token = token
+        self._base_headers = self._build_request_headers(token) if token else None
+
     @staticmethod
     def _get_resource(resource_template: SubscriptionResources, resource_id):
         return resource_template.value.format(resource_id)
 
     @staticmethod
     def _get_msgraph_time_format(minutes_to_expiration: int):
-        val = (datetime.utcnow() + timedelta(minutes=minutes_to_expiration)).strftime("%Y-%m-%dT%H:%M:%S.%f") + "0Z"
-        return val
+        dt = datetime.now(timezone.utc) + timedelta(minutes=minutes_to_expiration)
+        return dt.strftime("%Y-%m-%dT%H:%M:%S.") + f"{dt.microsecond:06d}0Z"
 
     def _log(self, level, msg):
         if self._enable_logging:
@@ -123,24 +286,76 @@ class GraphAdminClient:
         return urllib.parse.urlunparse(url_parts)
 
     async def _refresh_token(self, app_id, app_secret, tenant_id):
-        content, status_code = await self.acquire_token_by_tenant_id(app_id, app_secret, tenant_id)
-        self._token = content['access_token']
+        if not self._refresh_lock:
+            self._refresh_lock = asyncio.Lock()
+        expires_at = self._token_expires_at
+        async with self._refresh_lock:
+            if self._token_expires_at != expires_at:
+                # refreshed by a concurrent caller while we were waiting for the lock
+                return
+            content, status_code = await self._acquire_token_by_tenant_id(
+                app_id, app_secret, tenant_id, stale_token=self._token)
+            self._set_token(content['access_token'])
+            self._token_expires_at = time.monotonic() + int(content['expires_in']) - TOKEN_EXPIRY_MARGIN_SEC
         self._log(logging.INFO, "token has been refreshed")
 
+    def _next_token_refresh_delay(self):
+        delay = min(self._token_refresh_interval_sec, max(self._token_expires_at - time.monotonic(), 0))
+        return delay - random.uniform(0, min(TOKEN_REFRESH_JITTER_SEC, delay / 10))
+
+    async def _refresh_loop(self, app_id, app_secret, tenant_id):
+        delay = self._next_token_refresh_delay()
+        while self._managed:
+            await asyncio.sleep(delay)
+            try:
+                await self._refresh_token(app_id, app_secret, tenant_id)
+                delay = self._next_token_refresh_delay()
+            except Exception as e:
+                self._log(logging.ERROR, f"exception while refreshing token: {str(e)}")
+                delay = min(TOKEN_REFRESH_RETRY_SEC, self._token_refresh_interval_sec)
+
+    @staticmethod
+    def _get_retry_delay(attempt: int, resp_headers=None):
+        retry_after = resp_headers.get("Retry-After") if resp_headers else None
+        if retry_after:
+            delay = None
+            try:
+                delay = float(retry_after)
+            except ValueError:
+                try:
+                    delay = (parsedate_to_datetime(retry_after) - datetime.now(timezone.utc)).total_seconds()
+                except (TypeError, ValueError):
+                    pass
+            if delay is not None:
+                return min(max(delay, 0), MAX_RETRY_AFTER_SEC)
+        return min(2 ** attempt, MAX_RETRY_BACKOFF_SEC) + random.uniform(0, 1)
+
     async def _request(self, method, url, headers: dict = None, data: dict or str = None,
-                       expected_statuses: List[HTTPStatus] = None, timeout: int or float = 60):
-        if not self._session:
-            self._session = aiohttp.ClientSession()
+                       expected_statuses: List[HTTPStatus] = None, timeout: int or float = 60,
+                       json_body: dict = None):
+        send = self._send_httpx if self._use_httpx else self._send
+        retried_errors = _CONNECT_ERRORS + _DISCONNECT_ERRORS if method in IDEMPOTENT_METHODS else _CONNECT_ERRORS
+        if json_body is not None:
+            data = orjson.dumps(json_body)
         if not expected_statuses:
             expected_statuses = (HTTPStatus.OK, HTTPStatus.NO_CONTENT, HTTPStatus.CREATED, HTTPStatus.ACCEPTED)
         try:
-            async with self._session.request(method, url, headers=headers, data=data, timeout=timeout) as resp:
-                status = resp.status
-                resp_headers = resp.headers
-                if resp.headers.get('Content-Type') and 'application/json' in resp.headers['Content-Type']:
-                    r: dict = await resp.json()
-                else:
-                    r: bytes = await resp.read()
+            for attempt in range(self._max_retries + 1):
+                try:
+                    r, status, resp_headers = await send(method, url, headers, data, timeout)
+                except retried_errors as e:
+                    if attempt == self._max_retries:
+                        raise e
+                    delay = self._get_retry_delay(attempt)
+                    self._log(logging.WARNING, f"connection error ({str(e)}), retrying in {delay:.2f} seconds")
+                    await asyncio.sleep(delay)
+                    continue
+
+                if status not in RETRY_STATUSES or status in expected_statuses or attempt == self._max_retries:
+                    break
+                delay = self._get_retry_delay(attempt, resp_headers)
+                self._log(logging.WARNING, f"request url: {url}, status: {status}, retrying in {delay:.2f} seconds")
+                await asyncio.sleep(delay)
 
             if status in expected_statuses:
                 return r, status
@@ -160,6 +375,46 @@ class GraphAdminClient:
         :param timeout: Timeout that indicates how long (in seconds) to wait for response from _request
         :return: Dictionary with token data
         """
+        return await self._acquire_token_by_tenant_id(app_id, app_secret, tenant_id, timeout)
+
+    async def _acquire_token_by_tenant_id(self, app_id, app_secret, tenant_id, timeout: int or float = 60,
+                                          stale_token: str = None):
+        if not self._use_shared_cache:
+            return await self._request_token_by_tenant_id(app_id, app_secret, tenant_id, timeout)
+
+        # the secret is part of the key, so a wrong or revoked secret never gets a token acquired with another one
+        key = (self._mocked_graph_url, app_id, tenant_id, hashlib.sha256(app_secret.encode()).hexdigest())
+        content = self._get_cached_token(key, stale_token)
+        if content:
+            return content, HTTPStatus.OK
+        async with _get_token_lock(key):
+            # another client may have acquired the token while we were waiting for the lock
+            content = self._get_cached_token(key, stale_token)
+            if content:
+                return content, HTTPStatus.OK
+            content, status = await self._request_token_by_tenant_id(app_id, app_secret, tenant_id, timeout)
+            self._evict_expired_tokens()
+            _TOKEN_CACHE[key] = _CachedToken(dict(content), time.monotonic() + int(content['expires_in']))
+            return content, status
+
+    @staticmethod
+    def _get_cached_token(key, stale_token: str = None):
+        cached = _TOKEN_CACHE.get(key)
+        if not cached or cached.content['access_token'] == stale_token:
+            return None
+        expires_in = int(cached.expires_at - time.monotonic())
+        if expires_in <= TOKEN_EXPIRY_MARGIN_SEC:
+            del _TOKEN_CACHE[key]
+            return None
+        return dict(cached.content, expires_in=expires_in)
+
+    @staticmethod
+    def _evict_expired_tokens():
+        now = time.monotonic()
+        for key in [key for key, cached in _TOKEN_CACHE.items() if cached.expires_at <= now]:
+            del _TOKEN_CACHE[key]
+
+    async def _request_token_by_tenant_id(self, app_id, app_secret, tenant_id, timeout: int or float = 60):
         req_body = {
             "grant_type": "client_credentials",
             "scope": "https://graph.microsoft.com/.default",
@@ -200,7 +455,8 @@ class GraphAdminClient:
     async def manage_token(self, app_id, app_secret, tenant_id):
         """
         Let the client keep a valid token for you.
-        The client will refresh it (i.e. acquire new one) every token_refresh_interval_sec.
+        The client will refresh it (i.e. acquire new one) every token_refresh_interval_sec, or a few minutes before
+        it expires if that comes first.
         If the token is managed, then you don't need to provide it in every request.
         :param app_id: app_id: Also called client id, the identifier of your application in Azure,
         consent must have been granted in order to success
@@ -212,14 +468,27 @@ class GraphAdminClient:
             raise GraphClientException("Token is already managed")
         try:
             await self._refresh_token(app_id, app_secret, tenant_id)
-            self._scheduler.add_job(self._refresh_token, 'interval', args=[app_id, app_secret, tenant_id],
-                                    seconds=self._token_refresh_interval_sec)
-            self._scheduler.start()
             self._managed = True
+            self._refresh_task = asyncio.create_task(self._refresh_loop(app_id, app_secret, tenant_id))
         except Exception as e:
             self._log(logging.ERROR, f"exception while trying to set manage token: {str(e)}")
             raise GraphClientException(e)
 
+    async def stop_managing(self):
+        """
+        Stop refreshing the managed token, from now on the token must be provided with every call
+        """
+        self._managed = False
+        if self._refresh_task:
+            self._refresh_task.cancel()
+            try:
+                await self._refresh_task
+            except asyncio.CancelledError:
+                pass
+            self._refresh_task = None
+        self._set_token(None)
+        self._token_expires_at = None
+
     @authorized
     async def get_user(self, user_id, **kwargs):
         """
@@ -246,17 +515,34 @@ class GraphAdminClient:
                                           expected_statuses=kwargs.get("expected_statuses"))
         return res, status
 
-    @authorized
-    async def list_all_users(self, **kwargs) -> typing.AsyncGenerator[dict, None]:
-        res, status = await self.list_users_bulk(**kwargs)
-        next_url = res.get(NEXT_KEY)
-        for user in res["value"]:
-            yield user
-        while next_url:
-            res, status = await self.list_more(next_url, **kwargs)
-            next_url = res.get(NEXT_KEY)
-            for user in res["value"]:
-                yield user
+    async def _list_all(self, list_bulk, *args, **kwargs) -> typing.AsyncGenerator[dict, None]:
+        """
+        Yield the values of the first page returned by list_bulk(*args, **kwargs) and of all the pages following it,
+        each next page is requested while the values of the current one are consumed
+        """
+        res, status = await list_bulk(*args, **kwargs)
+        prefetch = None
+        try:
+            while True:
+                next_url = res.get(NEXT_KEY)
+                prefetch = asyncio.create_task(self.list_more(next_url, **kwargs)) if next_url else None
+                for value in res["value"]:
+                    yield value
+                if not prefetch:
+                    return
+                res, status = await prefetch
+        finally:
+            if prefetch:
+                # iteration stopped before the next page was consumed, don't leave its request behind
+                prefetch.cancel()
+                await asyncio.wait([prefetch])
+                if not prefetch.cancelled():
+                    # retrieve the exception (if any) so it isn't reported as unhandled
+                    prefetch.exception()
+
+    @authorized
+    def list_all_users(self, **kwargs) -> typing.AsyncGenerator[dict, None]:
+        return self._list_all(self.list_users_bulk, **kwargs)
 
     @authorized
     async def create_subscription(
@@ -292,7 +578,6 @@ class GraphAdminClient:
             "notificationUrl": notification_url,
             "resource": resource_str,
             "expirationDateTime": expiration_date_time,
-            "clientState": "secretClientValue"
         })
         if client_state:
             body["clientState"] = client_state
@@ -300,7 +585,8 @@ class GraphAdminClient:
         if latest_supported_tls_version:
             body["latestSupportedTlsVersion"] = latest_supported_tls_version
 
-        res, status = await self._request("POST", url, kwargs["_req_headers"], json.dumps(body), kwargs.get("expected_statuses"))
+        res, status = await self._request("POST", url, kwargs["_req_headers"], json_body=body,
+                                          expected_statuses=kwargs.get("expected_statuses"))
         return res, status
 
     @authorized
@@ -316,8 +602,8 @@ class GraphAdminClient:
             "expirationDateTime": expiration_date_time
         }
 
-        res, status = await self._request("PATCH", url, kwargs["_req_headers"], json.dumps(body),
-                                          kwargs.get("expected_statuses"))
+        res, status = await self._request("PATCH", url, kwargs["_req_headers"], json_body=body,
+                                          expected_statuses=kwargs.get("expected_statuses"))
         return res, status
 
     @authorized
@@ -339,16 +625,8 @@ class GraphAdminClient:
         return res, status
 
     @authorized
-    async def list_all_user_mails(self, user_id, **kwargs) -> typing.AsyncGenerator[dict, None]:
-        res, status = await self.list_user_mails_bulk(user_id, **kwargs)
-        next_url = res.get(NEXT_KEY)
-        for mail in res["value"]:
-            yield mail
-        while next_url:
-            res, status = await self.list_more(next_url, **kwargs)
-            next_url = res.get(NEXT_KEY)
-            for mail in res["value"]:
-                yield mail
+    def list_all_user_mails(self, user_id, **kwargs) -> typing.AsyncGenerator[dict, None]:
+        return self._list_all(self.list_user_mails_bulk, user_id, **kwargs)
 
     @authorized
     async def get_mail(self, user_id, message_id, as_mime=False, **kwargs):
@@ -426,7 +704,7 @@ class GraphAdminClient:
 
         url = self._build_url(V1_EP, [(USERS, mail['from']), (SENDMAIL, None)], **kwargs)
         res, status = await self._request("POST", url, kwargs["_req_headers"],
-                                          data=json.dumps(message),
+                                          json_body=message,
                                           expected_statuses=(HTTPStatus.ACCEPTED,))
         return res, status
 
@@ -506,16 +784,8 @@ class GraphAdminClient:
         return res, status
 
     @authorized
-    async def list_all_sites(self, **kwargs) -> typing.AsyncGenerator[dict, None]:
-        res, status = await self.list_sites_bulk(**kwargs)
-        next_url = res.get(NEXT_KEY)
-        for site in res["value"]:
-            yield site
-        while next_url:
-            res, status = await self.list_more(next_url, **kwargs)
-            next_url = res.get(NEXT_KEY)
-            for site in res["value"]:
-                yield site
+    def list_all_sites(self, **kwargs) -> typing.AsyncGenerator[dict, None]:
+        return self._list_all(self.list_sites_bulk, **kwargs)
 
     @authorized
     async def list_groups_bulk(self, **kwargs):
@@ -525,16 +795,8 @@ class GraphAdminClient:
         return res, status
 
     @authorized
-    async def list_all_groups(self, **kwargs) -> typing.AsyncGenerator[dict, None]:
-        res, status = await self.list_groups_bulk(**kwargs)
-        next_url = res.get(NEXT_KEY)
-        for group in res["value"]:
-            yield group
-        while next_url:
-            res, status = await self.list_more(next_url, **kwargs)
-            next_url = res.get(NEXT_KEY)
-            for group in res["value"]:
-                yield group
+    def list_all_groups(self, **kwargs) -> typing.AsyncGenerator[dict, None]:
+        return self._list_all(self.list_groups_bulk, **kwargs)
 
     @authorized
     async def get_site(self, site_id, **kwargs):
@@ -570,9 +832,8 @@ class GraphAdminClient:
             "extensionName": extension_name
         }
         data.update(extension_data or {})
-        data = json.dumps(data)
         return await self._request(
-            "POST", url, kwargs["_req_headers"], expected_statuses=kwargs.get("expected_statuses"), data=data)
+            "POST", url, kwargs["_req_headers"], expected_statuses=kwargs.get("expected_statuses"), json_body=data)
 
     @authorized
     async def delete_extension_from_message(self, user_id, message_id, extension_name, **kwargs):
@@ -611,16 +872,8 @@ class GraphAdminClient:
             "GET", url, kwargs["_req_headers"], expected_statuses=kwargs.get("expected_statuses"))
 
     @authorized
-    async def list_all_mail_folders(self, user_id, **kwargs) -> typing.AsyncGenerator[dict, None]:
-        res, status = await self.list_mail_folders_bulk(user_id, **kwargs)
-        next_url = res.get(NEXT_KEY)
-        for mail_folder in res["value"]:
-            yield mail_folder
-        while next_url:
-            res, status = await self.list_more(next_url, **kwargs)
-            next_url = res.get(NEXT_KEY)
-            for mail_folder in res["value"]:
-                yield mail_folder
+    def list_all_mail_folders(self, user_id, **kwargs) -> typing.AsyncGenerator[dict, None]:
+        return self._list_all(self.list_mail_folders_bulk, user_id, **kwargs)
 
     @authorized
     async def get_mail_folder(self, user_id, folder_id, **kwargs):
@@ -650,7 +903,7 @@ class GraphAdminClient:
             "contentBytes": b64_str_content
         }
         return await self._request(
-            "POST", url, kwargs["_req_headers"], data=json.dumps(body), expected_statuses=kwargs.get("expected_statuses"))
+            "POST", url, kwargs["_req_headers"], json_body=body, expected_statuses=kwargs.get("expected_statuses"))
 
     @authorized
     async def delete_mail(self, user_id, message_id, **kwargs):
@@ -663,7 +916,7 @@ class GraphAdminClient:
         url = self._build_url(V1_EP, [(USERS, user_id), (MAILS, message_id), (MOVE_MAIL, None)], **kwargs)
         body = {"destinationId": destination_folder_id}
         return await self._request(
-            "POST", url, kwargs["_req_headers"], json.dumps(body), expected_statuses=kwargs.get("expected_statuses"))
+            "POST", url, kwargs["_req_headers"], json_body=body, expected_statuses=kwargs.get("expected_statuses"))
 
     @authorized
     async def get_user_purpose(self, user_id, **kwargs):
@@ -682,3 +935,46 @@ class GraphAdminClient:
         url = self._build_url(V1_EP, [(DOMAINS, domain_id)], **kwargs)
         return await self._request(
             "GET", url, kwargs["_req_headers"], expected_statuses=kwargs.get("expected_statuses"))
+
+    @authorized
+    async def batch(self, sub_requests: List[dict], version: str = V1_EP, **kwargs):
+        """
+        Send many requests in json batches, each batch is a single http round trip for up to 20 requests,
+        and at most MAX_CONCURRENT_BATCHES batches are sent at once
+        :param sub_requests: list of dictionaries with 'method', 'url' (relative to the version, e.g. "/users/{id}")
+        and optionally 'headers' and 'body'
+        :param version: graph api version the urls are relative to
+        :return: list of the responses (dictionaries with id, status, headers and body), in the order of sub_requests,
+        and HTTPStatus.OK once every batch succeeded (each response carries its own status)
+        """
+        if not sub_requests:
+            raise GraphClientException("at least one request must be provided")
+
+        batch_requests = []
+        for i, sub_request in enumerate(sub_requests):
+            batch_request = {"id": str(i), "method": sub_request["method"], "url": sub_request["url"]}
+            # header names are case insensitive, lower them so the caller's content type isn't duplicated
+            headers = {name.lower(): value for name, value in (sub_request.get("headers") or {}).items()}
+            if sub_request.get("body") is not None:
+                batch_request["body"] = sub_request["body"]
+                headers.setdefault("content-type", "application/json")
+            if headers:
+                batch_request["headers"] = headers
+            batch_requests.append(batch_request)
+
+        url = self._build_url(version, [(BATCH, None)])
+        chunks = [batch_requests[i:i + MAX_BATCH_REQUESTS] for i in range(0, len(batch_requests), MAX_BATCH_REQUESTS)]
+        semaphore = asyncio.Semaphore(MAX_CONCURRENT_BATCHES)
+
+        async def send_chunk(chunk):
+            async with semaphore:
+                return await self._request("POST", url, kwargs["_req_headers"], json_body={"requests": chunk},
+                                           expected_statuses=kwargs.get("expected_statuses"))
+
+        results = await asyncio.gather(*[send_chunk(chunk) for chunk in chunks])
+
+        responses = [None] * len(sub_requests)
+        for res, _ in results:
+            for response in res["responses"]:
+                responses[int(response["id"])] = response
+        return responses, HTTPStatus.OK
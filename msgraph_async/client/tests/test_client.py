@@ -2,16 +2,25 @@ import os
 import json
 import asynctest
 import asyncio
+import logging
+import aiohttp
 import requests
 import urllib
 import urllib.parse
-from aioresponses import aioresponses
+from aioresponses import aioresponses, CallbackResult
 from datetime import datetime, timedelta
-from msgraph_async.client.client import GraphAdminClient
+from yarl import URL
+from unittest.mock import patch
+from msgraph_async.client.client import GraphAdminClient, _TOKEN_CACHE
 from msgraph_async.common.constants import *
 from msgraph_async.common.exceptions import *
 from msgraph_async.common.odata_query import *
 
+try:
+    import httpx
+except ImportError:
+    httpx = None
+
 
 class TestClient(asynctest.TestCase):
     _test_app_id = None
@@ -53,7 +62,7 @@ class TestClient(asynctest.TestCase):
     _domain_id = None
 
     def setUp(self):
-        pass
+        _TOKEN_CACHE.clear()
 
     @classmethod
     def setUpClass(cls):
@@ -135,6 +144,12 @@ class TestClient(asynctest.TestCase):
     def get_instance(mocked_graph_url=None):
         return GraphAdminClient(enable_logging=True, mocked_graph_url=mocked_graph_url)
 
+    @staticmethod
+    def get_httpx_instance(handler):
+        i = GraphAdminClient(enable_logging=True, use_httpx=True)
+        i._httpx_client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+        return i
+
     async def test_list_users_bulk_manual_token_with_top(self):
         i = self.get_instance()
         odata_query = ODataQuery()
@@ -183,6 +198,89 @@ class TestClient(asynctest.TestCase):
         self.assertIsNotNone(token2)
         self.assertNotEqual(token1, token2)
 
+    @aioresponses()
+    async def test_manage_token_refresh_scheduling(self, mocked_res):
+        url = "https://login.microsoftonline.com/tid/oauth2/v2.0/token"
+        mocked_res.post(url, status=200, body=json.dumps({"access_token": "t1", "expires_in": 1000}).encode())
+        mocked_res.post(url, status=200, body=json.dumps({"access_token": "t2", "expires_in": 2000}).encode())
+
+        i = GraphAdminClient(enable_logging=True, use_shared_cache=False)
+        delays = []
+
+        async def sleep(delay):
+            delays.append(delay)
+            if len(delays) == 2:
+                i._managed = False
+
+        with patch("msgraph_async.client.client.asyncio.sleep", sleep), \
+                patch("msgraph_async.client.client.random.uniform", lambda a, b: b):
+            await i.manage_token("app", "secret", "tid")
+            await i._refresh_task
+        await i.close()
+
+        # refreshed TOKEN_EXPIRY_MARGIN_SEC before the token expires, minus the maximal jitter
+        self.assertAlmostEqual(1000 - TOKEN_EXPIRY_MARGIN_SEC - TOKEN_REFRESH_JITTER_SEC, delays[0], delta=1)
+        self.assertAlmostEqual(2000 - TOKEN_EXPIRY_MARGIN_SEC - TOKEN_REFRESH_JITTER_SEC, delays[1], delta=1)
+
+    def test_next_token_refresh_delay_jitter(self):
+        i = self.get_instance()
+        i.token_refresh_interval_sec = 3300
+        with patch("msgraph_async.client.client.time.monotonic", return_value=1000):
+            i._token_expires_at = 1000 + 5000
+            for _ in range(100):
+                self.assertTrue(3300 - TOKEN_REFRESH_JITTER_SEC <= i._next_token_refresh_delay() <= 3300)
+            # the jitter is bounded by a tenth of the delay, so a close expiry is never refreshed too early
+            i._token_expires_at = 1000 + 100
+            for _ in range(100):
+                self.assertTrue(90 <= i._next_token_refresh_delay() <= 100)
+            i._token_expires_at = 1000 - 100
+            self.assertEqual(0, i._next_token_refresh_delay())
+
+    @aioresponses()
+    async def test_refresh_token_single_flight(self, mocked_res):
+        url = "https://login.microsoftonline.com/tid/oauth2/v2.0/token"
+        calls = []
+
+        async def token_callback(url, **kwargs):
+            calls.append(url)
+            await asyncio.sleep(0.01)
+            return CallbackResult(payload={"access_token": f"t{len(calls)}", "expires_in": 3599})
+
+        mocked_res.post(url, callback=token_callback, repeat=True)
+
+        i = GraphAdminClient(enable_logging=True, use_shared_cache=False)
+        await asyncio.gather(*[i._refresh_token("app", "secret", "tid") for _ in range(5)])
+        await i.close()
+
+        self.assertEqual(1, len(calls))
+        self.assertEqual("t1", i.token)
+
+    @aioresponses()
+    async def test_async_context_manager_closes(self, mocked_res):
+        mocked_res.post("https://login.microsoftonline.com/tid/oauth2/v2.0/token", status=200,
+                        body=json.dumps({"access_token": "tok", "expires_in": 3599}).encode())
+
+        async with self.get_instance() as i:
+            await i.manage_token("app", "secret", "tid")
+            session = i._session
+            refresh_task = i._refresh_task
+            self.assertFalse(session.closed)
+            self.assertFalse(refresh_task.done())
+
+        self.assertTrue(session.closed)
+        self.assertIsNone(i._session)
+        self.assertTrue(refresh_task.cancelled())
+        self.assertFalse(i.is_managed)
+        self.assertIsNone(i.token)
+
+    async def test_stop_managing(self):
+        i = self.get_instance()
+        await i.manage_token(TestClient._test_app_id, TestClient._test_app_secret, TestClient._test_tenant_id)
+        self.assertEqual(True, i.is_managed)
+        await i.stop_managing()
+        self.assertEqual(False, i.is_managed)
+        self.assertIsNone(i.token)
+
     async def test_get_user(self):
         i = self.get_instance()
         res, status = await i.get_user(TestClient._user_id, token=TestClient._token)
@@ -196,7 +294,7 @@ class TestClient(asynctest.TestCase):
         self.assertIsNotNone(token["access_token"])
 
     async def test_acquire_token_by_tenant_id_timeout(self):
-        i = self.get_instance()
+        i = GraphAdminClient(enable_logging=True, use_shared_cache=False)
         try:
             await i.acquire_token_by_tenant_id(TestClient._test_app_id, TestClient._test_app_secret,
                                                TestClient._test_tenant_id, timeout=0.01)
@@ -204,6 +302,79 @@ class TestClient(asynctest.TestCase):
         except asyncio.TimeoutError:
             pass
 
+    async def test_acquire_token_by_tenant_id_shared_cache(self):
+        i1 = self.get_instance()
+        i2 = self.get_instance()
+        token1, status = await i1.acquire_token_by_tenant_id(TestClient._test_app_id, TestClient._test_app_secret,
+                                                             TestClient._test_tenant_id)
+        self.assertEqual(status, HTTPStatus.OK)
+        token2, status = await i2.acquire_token_by_tenant_id(TestClient._test_app_id, TestClient._test_app_secret,
+                                                             TestClient._test_tenant_id)
+        self.assertEqual(status, HTTPStatus.OK)
+        self.assertEqual(token1["access_token"], token2["access_token"])
+
+    def test_shared_token_cache_across_event_loops(self):
+        url = "https://login.microsoftonline.com/tid/oauth2/v2.0/token"
+
+        async def token_callback(url, **kwargs):
+            await asyncio.sleep(0.01)
+            return CallbackResult(payload={"access_token": "shared", "expires_in": 3599})
+
+        async def manage_two_clients():
+            clients = [self.get_instance(), self.get_instance()]
+            await asyncio.gather(*[client.manage_token("app", "secret", "tid") for client in clients])
+            tokens = [client.token for client in clients]
+            for client in clients:
+                await client.close()
+            return tokens
+
+        with aioresponses() as mocked_res:
+            mocked_res.post(url, callback=token_callback, repeat=True)
+            for _ in range(2):
+                _TOKEN_CACHE.clear()
+                loop = asyncio.new_event_loop()
+                try:
+                    self.assertEqual(["shared", "shared"], loop.run_until_complete(manage_two_clients()))
+                finally:
+                    loop.close()
+
+    @aioresponses()
+    async def test_shared_token_cache_wrong_secret(self, mocked_res):
+        url = "https://login.microsoftonline.com/tid/oauth2/v2.0/token"
+        mocked_res.post(url, status=200, body=json.dumps({"access_token": "good", "expires_in": 3599}).encode())
+        mocked_res.post(url, status=401, body=json.dumps({"error": "invalid_client"}).encode())
+
+        token, status = await self.get_instance().acquire_token_by_tenant_id("app", "secret", "tid")
+        self.assertEqual("good", token["access_token"])
+        try:
+            await self.get_instance().acquire_token_by_tenant_id("app", "wrong-secret", "tid")
+            self.fail("should raise an exception")
+        except Unauthorized:
+            pass
+
+    @aioresponses()
+    async def test_shared_token_cache_isolation(self, mocked_res):
+        url = "https://login.microsoftonline.com/tid/oauth2/v2.0/token"
+        mocked_res.post(url, status=200, body=json.dumps({"access_token": "good", "expires_in": 3599}).encode())
+
+        token, status = await self.get_instance().acquire_token_by_tenant_id("app", "secret", "tid")
+        token["access_token"] = "changed"
+        token, status = await self.get_instance().acquire_token_by_tenant_id("app", "secret", "tid")
+        self.assertEqual("good", token["access_token"])
+
+    @aioresponses()
+    async def test_shared_token_cache_eviction(self, mocked_res):
+        url = "https://login.microsoftonline.com/{}/oauth2/v2.0/token"
+        mocked_res.post(url.format("tid1"), status=200,
+                        body=json.dumps({"access_token": "t1", "expires_in": 0}).encode())
+        mocked_res.post(url.format("tid2"), status=200,
+                        body=json.dumps({"access_token": "t2", "expires_in": 3599}).encode())
+
+        i = self.get_instance()
+        await i.acquire_token_by_tenant_id("app", "secret", "tid1")
+        await i.acquire_token_by_tenant_id("app", "secret", "tid2")
+        self.assertEqual(["t2"], [cached.content["access_token"] for cached in _TOKEN_CACHE.values()])
+
     async def test_acquire_token_by_tenant_id_no_timeout(self):
         i = self.get_instance()
         token, status = await i.acquire_token_by_tenant_id(TestClient._test_app_id, TestClient._test_app_secret,
@@ -226,6 +397,56 @@ class TestClient(asynctest.TestCase):
             users.append(user)
         self.assertEqual(TestClient._total_users_count, len(users))
 
+    @aioresponses()
+    async def test_list_all_users_pages_order(self, mocked_res):
+        i = self.get_instance()
+
+        url = "https://graph.microsoft.com/v1.0/users"
+        mocked_res.get(url, status=200, body=json.dumps(
+            {"value": [{"id": "1"}, {"id": "2"}], NEXT_KEY: f"{url}?page=2"}).encode())
+        mocked_res.get(f"{url}?page=2", status=200, body=json.dumps(
+            {"value": [{"id": "3"}], NEXT_KEY: f"{url}?page=3"}).encode())
+        mocked_res.get(f"{url}?page=3", status=200, body=json.dumps({"value": [{"id": "4"}]}).encode())
+
+        users = [user["id"] async for user in i.list_all_users(token=TestClient._token)]
+
+        self.assertEqual(["1", "2", "3", "4"], users)
+
+    @aioresponses()
+    async def test_list_all_users_next_page_error(self, mocked_res):
+        i = self.get_instance()
+
+        url = "https://graph.microsoft.com/v1.0/users"
+        mocked_res.get(url, status=200, body=json.dumps(
+            {"value": [{"id": "1"}, {"id": "2"}], NEXT_KEY: f"{url}?page=2"}).encode())
+        mocked_res.get(f"{url}?page=2", status=500, body=json.dumps({"error": "bla"}).encode())
+
+        users = []
+        try:
+            async for user in i.list_all_users(token=TestClient._token):
+                users.append(user["id"])
+            self.fail("should raise an exception")
+        except InternalServerError as e:
+            self.assertEqual(e.request_url, f"{url}?page=2")
+        self.assertEqual(["1", "2"], users)
+
+    @aioresponses()
+    async def test_list_all_users_close_early(self, mocked_res):
+        i = self.get_instance()
+
+        url = "https://graph.microsoft.com/v1.0/users"
+        mocked_res.get(url, status=200, body=json.dumps(
+            {"value": [{"id": "1"}, {"id": "2"}], NEXT_KEY: f"{url}?page=2"}).encode())
+        mocked_res.get(f"{url}?page=2", status=200, body=json.dumps({"value": [{"id": "3"}]}).encode())
+
+        users = i.list_all_users(token=TestClient._token)
+        async for user in users:
+            break
+        await users.aclose()
+
+        pending = [task for task in asyncio.all_tasks() if task is not asyncio.current_task()]
+        self.assertEqual([], pending)
+
     async def test_mailbox_subscription_lifecycle(self):
         i = self.get_instance()
         minutes_to_expire = 10
@@ -254,6 +475,18 @@ class TestClient(asynctest.TestCase):
 
         self.assertEqual(status, HTTPStatus.NO_CONTENT)
 
+    @aioresponses()
+    async def test_delete_subscription_no_content(self, mocked_res):
+        i = self.get_instance()
+
+        url = "https://graph.microsoft.com/v1.0/subscriptions/sid"
+        mocked_res.delete(url, status=204)
+
+        res, status = await i.delete_subscription("sid", SubscriptionResources.Mailbox, token=TestClient._token)
+
+        self.assertEqual(status, HTTPStatus.NO_CONTENT)
+        self.assertIsNone(res)
+
     async def test_tenant_channels_subscription_lifecycle(self):
         i = self.get_instance()
 
@@ -383,7 +616,8 @@ class TestClient(asynctest.TestCase):
 
         url = "https://graph.microsoft.com/v1.0/users/uid/messages/mid"
         error_dict = {"error": "maximum bla bla bla"}
-        mocked_res.get(url, status=429, body=json.dumps(error_dict).encode())
+        mocked_res.get(url, status=429, headers={"Retry-After": "0"}, body=json.dumps(error_dict).encode(),
+                       repeat=True)
         try:
             await i.get_mail("uid", "mid", token=TestClient._token)
             self.fail("should raise an exception")
@@ -393,13 +627,235 @@ class TestClient(asynctest.TestCase):
             self.assertEqual(e.response_content, error_dict)
             self.assertIsNotNone(e.response_headers)
 
+    @aioresponses()
+    async def test_get_mail_simulating_429_then_success(self, mocked_res):
+        i = self.get_instance()
+
+        url = "https://graph.microsoft.com/v1.0/users/uid/messages/mid"
+        error_dict = {"error": "maximum bla bla bla"}
+        mail_dict = {"id": "mid"}
+        mocked_res.get(url, status=429, headers={"Retry-After": "0"}, body=json.dumps(error_dict).encode())
+        mocked_res.get(url, status=200, body=json.dumps(mail_dict).encode())
+
+        mail, status = await i.get_mail("uid", "mid", token=TestClient._token)
+
+        self.assertEqual(status, HTTPStatus.OK)
+        self.assertEqual(mail, mail_dict)
+
+    @aioresponses()
+    async def test_batch_responses_order(self, mocked_res):
+        i = self.get_instance()
+
+        url = "https://graph.microsoft.com/v1.0/$batch"
+        responses = [{"id": "1", "status": 200, "body": {"id": "mid"}},
+                     {"id": "0", "status": 200, "body": {"id": "uid"}}]
+        mocked_res.post(url, status=200, body=json.dumps({"responses": responses}).encode())
+
+        res, status = await i.batch([{"method": "GET", "url": "/users/uid"},
+                                     {"method": "GET", "url": "/users/uid/messages/mid"}], token=TestClient._token)
+
+        self.assertEqual(status, HTTPStatus.OK)
+        self.assertEqual(["uid", "mid"], [response["body"]["id"] for response in res])
+
+    @aioresponses()
+    async def test_batch_content_type_header(self, mocked_res):
+        i = self.get_instance()
+
+        url = "https://graph.microsoft.com/v1.0/$batch"
+        sent = []
+
+        def callback(url, **kwargs):
+            sent.extend(json.loads(kwargs["data"])["requests"])
+            return CallbackResult(status=200, body=json.dumps({"responses": []}))
+
+        mocked_res.post(url, callback=callback)
+
+        await i.batch([{"method": "POST", "url": "/users/uid/messages", "body": {"subject": "s"},
+                        "headers": {"content-type": "application/json; charset=utf-8"}},
+                       {"method": "POST", "url": "/users/uid/messages", "body": {"subject": "s"}}],
+                      token=TestClient._token)
+
+        self.assertEqual({"content-type": "application/json; charset=utf-8"}, sent[0]["headers"])
+        self.assertEqual({"content-type": "application/json"}, sent[1]["headers"])
+
+    @aioresponses()
+    async def test_batch_concurrency(self, mocked_res):
+        i = self.get_instance()
+
+        url = "https://graph.microsoft.com/v1.0/$batch"
+        in_flight = []
+        max_in_flight = 0
+
+        async def callback(url, **kwargs):
+            nonlocal max_in_flight
+            in_flight.append(url)
+            max_in_flight = max(max_in_flight, len(in_flight))
+            await asyncio.sleep(0.01)
+            in_flight.pop()
+            responses = [{"id": request["id"], "status": 200, "body": {"id": request["url"]}}
+                         for request in json.loads(kwargs["data"])["requests"]]
+            return CallbackResult(status=200, body=json.dumps({"responses": responses}))
+
+        mocked_res.post(url, callback=callback, repeat=True)
+
+        sub_requests = [{"method": "GET", "url": f"/users/{n}"} for n in range(MAX_BATCH_REQUESTS * 10)]
+        res, status = await i.batch(sub_requests, token=TestClient._token)
+
+        self.assertEqual(MAX_CONCURRENT_BATCHES, max_in_flight)
+        self.assertEqual([sub_request["url"] for sub_request in sub_requests],
+                         [response["body"]["id"] for response in res])
+
+    async def test_batch(self):
+        i = self.get_instance()
+        res, status = await i.batch([{"method": "GET", "url": f"/users/{TestClient._user_id}"},
+                                     {"method": "GET", "url": f"/groups/{TestClient._group_id}"}],
+                                    token=TestClient._token)
+        self.assertEqual(status, HTTPStatus.OK)
+        self.assertEqual(2, len(res))
+        self.assertEqual(TestClient._user_id, res[0]["body"]["id"])
+        self.assertEqual(TestClient._group_id, res[1]["body"]["id"])
+
+    @aioresponses()
+    async def test_get_mail_retry_after_disconnect(self, mocked_res):
+        i = self.get_instance()
+
+        url = "https://graph.microsoft.com/v1.0/users/uid/messages/mid"
+        mail_dict = {"id": "mid"}
+        mocked_res.get(url, exception=aiohttp.ServerDisconnectedError())
+        mocked_res.get(url, exception=aiohttp.ClientOSError(104, "Connection reset by peer"))
+        mocked_res.get(url, status=200, body=json.dumps(mail_dict).encode())
+
+        with patch.object(GraphAdminClient, "_get_retry_delay", return_value=0):
+            mail, status = await i.get_mail("uid", "mid", token=TestClient._token)
+
+        self.assertEqual(status, HTTPStatus.OK)
+        self.assertEqual(mail, mail_dict)
+
+    @aioresponses()
+    async def test_move_mail_no_retry_after_disconnect(self, mocked_res):
+        i = self.get_instance()
+
+        url = "https://graph.microsoft.com/v1.0/users/uid/messages/mid/move"
+        mocked_res.post(url, exception=aiohttp.ServerDisconnectedError())
+        mocked_res.post(url, status=201, body=json.dumps({"id": "mid"}).encode())
+
+        try:
+            await i.move_mail("uid", "mid", "fid", token=TestClient._token)
+            self.fail("should raise an exception")
+        except aiohttp.ServerDisconnectedError:
+            pass
+
+    def test_retry_after_capped(self):
+        delay = GraphAdminClient._get_retry_delay(0, {"Retry-After": str(MAX_RETRY_AFTER_SEC * 10)})
+        self.assertEqual(MAX_RETRY_AFTER_SEC, delay)
+
+    @asynctest.skipIf(httpx is None, "httpx is not installed")
+    async def test_httpx_form_body(self):
+        requests_sent = []
+
+        def handler(request):
+            requests_sent.append(request)
+            return httpx.Response(200, json={"access_token": "tok", "expires_in": 3599})
+
+        i = self.get_httpx_instance(handler)
+        token, status = await i.acquire_token_by_tenant_id("app", "secret", "tid", timeout=5)
+        await i.close()
+
+        self.assertEqual(status, HTTPStatus.OK)
+        self.assertEqual("tok", token["access_token"])
+        self.assertEqual("application/x-www-form-urlencoded", requests_sent[0].headers["content-type"])
+        self.assertEqual("secret", urllib.parse.parse_qs(requests_sent[0].content.decode())["client_secret"][0])
+        self.assertEqual(5, requests_sent[0].extensions["timeout"]["read"])
+
+    @asynctest.skipIf(httpx is None, "httpx is not installed")
+    async def test_httpx_raw_body(self):
+        requests_sent = []
+
+        def handler(request):
+            requests_sent.append(request)
+            return httpx.Response(201, content=b'{"id": "mid"}',
+                                  headers={"Content-Type": "Application/JSON; charset=utf-8"})
+
+        i = self.get_httpx_instance(handler)
+        mail, status = await i.move_mail("uid", "mid", "fid", token=TestClient._token)
+        await i.close()
+
+        self.assertEqual(status, HTTPStatus.CREATED)
+        self.assertEqual({"id": "mid"}, mail)
+        self.assertEqual({"destinationId": "fid"}, json.loads(requests_sent[0].content))
+        self.assertEqual("application/json", requests_sent[0].headers["content-type"])
+
+    @asynctest.skipIf(httpx is None, "httpx is not installed")
+    async def test_httpx_not_json_and_no_content(self):
+        def handler(request):
+            if request.method == "DELETE":
+                return httpx.Response(204)
+            return httpx.Response(200, content=b"mime", headers={"Content-Type": "text/plain"})
+
+        i = self.get_httpx_instance(handler)
+        mail, status = await i.get_mail("uid", "mid", as_mime=True, token=TestClient._token)
+        self.assertEqual(b"mime", mail)
+        res, status = await i.delete_subscription("sid", SubscriptionResources.Mailbox, token=TestClient._token)
+        await i.close()
+
+        self.assertEqual(status, HTTPStatus.NO_CONTENT)
+        self.assertIsNone(res)
+
+    @asynctest.skipIf(httpx is None, "httpx is not installed")
+    async def test_httpx_timeout(self):
+        def handler(request):
+            raise httpx.ReadTimeout("timed out", request=request)
+
+        i = self.get_httpx_instance(handler)
+        try:
+            await i.get_mail("uid", "mid", token=TestClient._token)
+            self.fail("should raise an exception")
+        except asyncio.TimeoutError:
+            pass
+        finally:
+            await i.close()
+
+    @asynctest.skipIf(httpx is None, "httpx is not installed")
+    async def test_httpx_connect_error_retried(self):
+        requests_sent = []
+
+        def handler(request):
+            requests_sent.append(request)
+            if len(requests_sent) == 1:
+                raise httpx.ConnectError("connection refused", request=request)
+            return httpx.Response(201, json={"id": "mid"})
+
+        i = self.get_httpx_instance(handler)
+        with patch.object(GraphAdminClient, "_get_retry_delay", return_value=0):
+            mail, status = await i.move_mail("uid", "mid", "fid", token=TestClient._token)
+        await i.close()
+
+        self.assertEqual(status, HTTPStatus.CREATED)
+        self.assertEqual(2, len(requests_sent))
+
+    def test_use_httpx_without_h2(self):
+        with patch("msgraph_async.client.client.h2", None):
+            try:
+                GraphAdminClient(use_httpx=True)
+                self.fail("should raise an exception")
+            except GraphClientException:
+                pass
+
+    def test_negative_max_retries(self):
+        try:
+            GraphAdminClient(max_retries=-1)
+            self.fail("should raise an exception")
+        except ValueError:
+            pass
+
     @aioresponses()
     async def test_get_mail_broad_exception_clause(self, mocked_res):
         i = self.get_instance()
 
         url = "https://graph.microsoft.com/v1.0/users/uid/messages/mid"
         error_dict = {"error": "maximum bla bla bla"}
-        mocked_res.get(url, status=429, body=json.dumps(error_dict).encode())
+        mocked_res.get(url, status=429, headers={"Retry-After": "0"}, body=json.dumps(error_dict).encode(),
+                       repeat=True)
         try:
             await i.get_mail("uid", "mid", token=TestClient._token)
             self.fail("should raise an exception")
@@ -742,6 +1198,33 @@ class TestClient(asynctest.TestCase):
         except BaseHttpError as e:
             self.assertEqual(e.request_url, url)
 
+    @aioresponses()
+    async def test_warmup_mocked_graph_url(self, mocked_res):
+        mocked_base_url = "http://my-mocked-msgraph-service.com"
+        i = self.get_instance(mocked_graph_url=mocked_base_url)
+        mocked_res.get(mocked_base_url, status=404)
+
+        await i.warmup()
+        session = i._session
+        await i.close()
+
+        self.assertIsNotNone(session)
+        self.assertEqual([("GET", URL(mocked_base_url))], list(mocked_res.requests))
+        self.assertEqual(1, len(mocked_res.requests[("GET", URL(mocked_base_url))]))
+
+    @aioresponses()
+    async def test_warmup_failing_endpoint(self, mocked_res):
+        i = self.get_instance()
+        mocked_res.get(GRAPH_BASE_URL, status=404)
+        mocked_res.get(GRAPH_CONSENT_URL, exception=aiohttp.ClientConnectionError("connection refused"))
+
+        with self.assertLogs(level=logging.WARNING) as logs:
+            await i.warmup()
+        await i.close()
+
+        self.assertEqual({("GET", URL(GRAPH_BASE_URL)), ("GET", URL(GRAPH_CONSENT_URL))}, set(mocked_res.requests))
+        self.assertIn(f"failed to warm up connection to {GRAPH_CONSENT_URL}", logs.output[0])
+
     async def test_get_folder_by_known_name(self):
         i = self.get_instance()
         res, status = await i.get_mail_folder(TestClient._user_id, TestClient._folder_name, token=TestClient._token)
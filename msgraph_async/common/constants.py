@@ -1,4 +1,5 @@
 from enum import Enum
+from http import HTTPStatus
 
 GRAPH_BASE_URL = "https://graph.microsoft.com"
 GRAPH_CONSENT_URL = "https://login.microsoftonline.com"
@@ -33,6 +34,12 @@ USER_PURPOSE = "userPurpose"
 # operations
 SENDMAIL = "/sendmail"
 MOVE_MAIL = "/move"
+BATCH = "/$batch"
+
+# maximal number of requests graph accepts in a single json batch
+MAX_BATCH_REQUESTS = 20
+# maximal number of json batches in flight at once, more would just get throttled
+MAX_CONCURRENT_BATCHES = 4
 
 # next_key
 NEXT_KEY = "@odata.nextLink"
@@ -41,6 +48,26 @@ NEXT_KEY = "@odata.nextLink"
 DELTA_KEY = "@odata.deltaLink"
 
 
+# token refresh
+# managed tokens are refreshed this long before they actually expire
+TOKEN_EXPIRY_MARGIN_SEC = 300
+# upper bound of the random offset applied to each refresh, so many clients don't refresh at the same moment
+TOKEN_REFRESH_JITTER_SEC = 30
+# delay before retrying a failed refresh
+TOKEN_REFRESH_RETRY_SEC = 60
+
+
+# request retries
+# statuses graph returns when throttling or temporarily unavailable, the request is retried after Retry-After
+RETRY_STATUSES = (HTTPStatus.TOO_MANY_REQUESTS, HTTPStatus.SERVICE_UNAVAILABLE)
+# cap of the exponential backoff used when there's no Retry-After to honor
+MAX_RETRY_BACKOFF_SEC = 30
+# cap of the Retry-After delay honored before retrying
+MAX_RETRY_AFTER_SEC = 120
+# methods that are safe to send again after the connection dropped mid request
+IDEMPOTENT_METHODS = ("GET", "HEAD", "OPTIONS", "PUT", "DELETE")
+
+
 # Subscription Resources
 class SubscriptionResources(str, Enum):
 
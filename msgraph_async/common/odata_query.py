@@ -4,21 +4,23 @@ from enum import Enum
 
 class LogicalOperator(int, Enum):
 
-    def __new__(cls, value, template=None):
+    def __new__(cls, value, render):
         logical_operator = int.__new__(cls, value)
         logical_operator._value_ = value
-        logical_operator.template = template
+        # render(attribute, val, inner_attribute) builds the constrain expression with a precompiled f-string
+        logical_operator.render = render
+        logical_operator.template = render("{attribute}", "{val}", "{inner_attribute}")
         return logical_operator
 
-    EQ = 1, "{attribute} eq {val}"
-    NE = 2, "{attribute} ne {val}"
-    LT = 3, "{attribute} lt {val}"
-    GT = 4, "{attribute} gt {val}"
-    LE = 5, "{attribute} le {val}"
-    GE = 6, "{attribute} ge {val}"
-    STARTS_WITH = 7, "startswith({attribute}, '{val}')"
-    ENDS_WITH = 8, "endswith({attribute}, '{val}')"
-    ANY_EQ = 9, "{attribute}/any(f:f/{inner_attribute} eq '{val}')"
+    EQ = 1, lambda attribute, val, inner_attribute: f"{attribute} eq {val}"
+    NE = 2, lambda attribute, val, inner_attribute: f"{attribute} ne {val}"
+    LT = 3, lambda attribute, val, inner_attribute: f"{attribute} lt {val}"
+    GT = 4, lambda attribute, val, inner_attribute: f"{attribute} gt {val}"
+    LE = 5, lambda attribute, val, inner_attribute: f"{attribute} le {val}"
+    GE = 6, lambda attribute, val, inner_attribute: f"{attribute} ge {val}"
+    STARTS_WITH = 7, lambda attribute, val, inner_attribute: f"startswith({attribute}, '{val}')"
+    ENDS_WITH = 8, lambda attribute, val, inner_attribute: f"endswith({attribute}, '{val}')"
+    ANY_EQ = 9, lambda attribute, val, inner_attribute: f"{attribute}/any(f:f/{inner_attribute} eq '{val}')"
 
 
 class Order(int, Enum):
@@ -40,6 +42,8 @@ class Constrain:
     Constrain example for O365 message resource which has the attribute subject equals to "Trip Ahead" will be instanced
     like this: c = Constrain("subject", LogicalOperator.EQ, "Trip Ahead"
     """
+    __slots__ = ("_attribute", "_logical_operator", "_value", "_inner_attribute", "_rendered")
+
     def __init__(self, attribute: str, logical_operator: LogicalOperator, value: str, inner_attribute: str = None):
         self.attribute = attribute
         self.logical_operator = logical_operator
@@ -52,9 +56,10 @@ class Constrain:
 
     @attribute.setter
     def attribute(self, val: str):
-        if type(val) != str:
+        if not isinstance(val, str):
             raise ValueError("attribute must be string")
         self._attribute = val
+        self._rendered = None
 
     @property
     def logical_operator(self) -> LogicalOperator:
@@ -62,9 +67,10 @@ class Constrain:
 
     @logical_operator.setter
     def logical_operator(self, val: LogicalOperator):
-        if type(val) != LogicalOperator:
+        if not isinstance(val, LogicalOperator):
             raise ValueError("logical operator must be of type LogicalOperator")
         self._logical_operator = val
+        self._rendered = None
 
     @property
     def value(self) -> str:
@@ -72,9 +78,10 @@ class Constrain:
 
     @value.setter
     def value(self, val: str):
-        if type(val) != str:
+        if not isinstance(val, str):
             raise ValueError("value must be str")
         self._value = val
+        self._rendered = None
 
     @property
     def inner_attribute(self) -> str:
@@ -82,16 +89,20 @@ class Constrain:
 
     @inner_attribute.setter
     def inner_attribute(self, val: str):
-        if val and type(val) != str:
+        if val and not isinstance(val, str):
             raise ValueError("inner attribute must be str")
         self._inner_attribute = val
+        self._rendered = None
 
     def __str__(self):
-        return self._logical_operator.template.format(attribute=self._attribute, val=self._value,
-                                                      inner_attribute=self._inner_attribute)
+        if self._rendered is None:
+            self._rendered = self._logical_operator.render(self._attribute, self._value, self._inner_attribute)
+        return self._rendered
 
 
 class Filter:
+    __slots__ = ("_constrains", "_logical_connector")
+
     def __init__(self, constrains: typing.List[Constrain], logical_connector: LogicalConnector = None):
         self.constrains = constrains
         self.logical_connector = logical_connector
@@ -102,11 +113,10 @@ class Filter:
 
     @constrains.setter
     def constrains(self, value):
-        if type(value) is not list:
+        if not isinstance(value, list):
             raise ValueError("constrains must be list")
-        for val in value:
-            if type(val) is not Constrain:
-                raise ValueError("all values must be constrains")
+        if not all(isinstance(val, Constrain) for val in value):
+            raise ValueError("all values must be constrains")
         self._constrains = value
 
     @property
@@ -119,13 +129,20 @@ class Filter:
             if value is not None:
                 raise ValueError("logical connector has no meaning with single constrain")
 
-        elif type(value) is not LogicalConnector:
+        elif not isinstance(value, LogicalConnector):
             raise ValueError("logical connector must be of type LogicalConnector")
 
         self._logical_connector = value
 
+    def __str__(self):
+        # constrains cache their own rendering, so joining them stays cheap
+        connector = f" {self._logical_connector.name.lower()} " if self._logical_connector else ""
+        return connector.join(str(constrain) for constrain in self._constrains)
+
 
 class OrderBy:
+    __slots__ = ("_attribute", "_order")
+
     def __init__(self, attribute, order):
         self.attribute = attribute
         self.order = order
@@ -136,7 +153,7 @@ class OrderBy:
 
     @attribute.setter
     def attribute(self, value: str):
-        if type(value) is not str:
+        if not isinstance(value, str):
             raise ValueError("attribute must be string")
         self._attribute = value
 
@@ -146,7 +163,7 @@ class OrderBy:
 
     @order.setter
     def order(self, value: Order):
-        if type(value) is not Order:
+        if not isinstance(value, Order):
             raise ValueError("order must be of type Order")
         self._order = value
 
@@ -155,13 +172,32 @@ class OrderBy:
 
 
 class ODataQuery:
-    def __init__(self):
+    """
+    The query can be built in a single call, e.g. ODataQuery(top=10, select=["id", "subject"]), every given value
+    is validated once by its setter. Values can also be set (or changed) later through the properties.
+    """
+    __slots__ = ("_count", "_expand", "_filter", "_select", "_top", "_order_by")
+
+    def __init__(self, count: bool = None, expand: str = None, filter: Filter = None, select: typing.List[str] = None,
+                 top: int = None, order_by: OrderBy = None):
         self._count = None
         self._expand = None
         self._filter = None
         self._select = None
         self._top = None
         self._order_by = None
+        if count is not None:
+            self.count = count
+        if expand is not None:
+            self.expand = expand
+        if filter is not None:
+            self.filter = filter
+        if select is not None:
+            self.select = select
+        if top is not None:
+            self.top = top
+        if order_by is not None:
+            self.order_by = order_by
 
     @property
     def count(self) -> bool:
@@ -170,7 +206,7 @@ class ODataQuery:
 
     @count.setter
     def count(self, value: bool):
-        if type(value) is not bool:
+        if not isinstance(value, bool):
             raise ValueError("count must be boolean")
         self._count = value
 
@@ -181,7 +217,7 @@ class ODataQuery:
 
     @expand.setter
     def expand(self, value: str):
-        if type(value) is not str:
+        if not isinstance(value, str):
             raise ValueError("expand must be string")
         self._expand = value
 
@@ -192,7 +228,7 @@ class ODataQuery:
 
     @filter.setter
     def filter(self, value: Filter):
-        if type(value) is not Filter:
+        if not isinstance(value, Filter):
             raise ValueError("filter must of Filter type")
         self._filter = value
 
@@ -203,11 +239,10 @@ class ODataQuery:
 
     @select.setter
     def select(self, value: typing.List[str]):
-        if type(value) is not list:
+        if not isinstance(value, list):
             raise ValueError("select must be list of strings")
-        for val in value:
-            if type(val) is not str:
-                raise ValueError("all values should be strings")
+        if not all(isinstance(val, str) for val in value):
+            raise ValueError("all values should be strings")
         self._select = value
 
     @property
@@ -217,7 +252,7 @@ class ODataQuery:
 
     @top.setter
     def top(self, value: int):
-        if type(value) is not int:
+        if not isinstance(value, int) or isinstance(value, bool):
             raise ValueError("top must be integer")
         self._top = value
 
@@ -228,18 +263,10 @@ class ODataQuery:
 
     @order_by.setter
     def order_by(self, value: OrderBy):
-        if type(value) is not OrderBy:
+        if not isinstance(value, OrderBy):
             raise ValueError("order_by must be OrderBy")
         self._order_by = value
 
-    def _build_filter(self):
-        res = ""
-        for constrain in self.filter.constrains:  # type: Constrain
-            if res:
-                res += f" {self.filter.logical_connector.name.lower()} "
-            res += str(constrain)
-        return res
-
     def __str__(self):
         if not self.count and not self.expand and not self.filter and not self.select and not self.top:
             return "EMPTY OPEN DATA QUERY"
@@ -249,7 +276,7 @@ class ODataQuery:
         if self.expand:
             res.append(f"$expand={self.expand.lower()}")
         if self.filter and self.filter.constrains:
-            res.append(f"$filter={self._build_filter()}")
+            res.append(f"$filter={str(self.filter)}")
         if self.select:
             res.append(f"$select={','.join(self.select)}")
         if self.top:
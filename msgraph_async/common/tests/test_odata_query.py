@@ -78,6 +78,14 @@ class TestODataQuery(unittest.TestCase):
         except ValueError:
             pass
 
+    def test_top_set_bool_value(self):
+        i = self.get_instance()
+        try:
+            i.top = True
+            self.fail()
+        except ValueError:
+            pass
+
     def test_top_set(self):
         i = self.get_instance()
         i.top = 10
@@ -119,3 +127,54 @@ class TestODataQuery(unittest.TestCase):
         i.select = ["displayName", "firstName", "lastName"]
 
         self.assertEqual("?$count=true&$expand=groups&$filter=city ne New-York or displayName eq Noam Meirovitch&$select=displayName,firstName,lastName&$top=15", str(i))
+
+    def test_query_changes_after_rendering(self):
+        i = self.get_instance()
+        i.top = 10
+        self.assertEqual(str(i), "?$top=10")
+
+        i.top = 20
+        i.filter = Filter([Constrain("displayName", LogicalOperator.STARTS_WITH, "N")])
+
+        self.assertEqual("?$filter=startswith(displayName, 'N')&$top=20", str(i))
+
+    def test_constrain_changes_after_rendering(self):
+        c = Constrain("city", LogicalOperator.NE, "New-York")
+        self.assertEqual("city ne New-York", str(c))
+
+        c.logical_operator = LogicalOperator.EQ
+
+        self.assertEqual("city eq New-York", str(c))
+
+    def test_any_eq_constrain(self):
+        c = Constrain("emailAddresses", LogicalOperator.ANY_EQ, "a@b.com", inner_attribute="address")
+        self.assertEqual("emailAddresses/any(f:f/address eq 'a@b.com')", str(c))
+
+    def test_logical_operator_template(self):
+        self.assertEqual("startswith({attribute}, '{val}')", LogicalOperator.STARTS_WITH.template)
+
+    def test_query_from_constructor(self):
+        f = Filter([Constrain("city", LogicalOperator.NE, "New-York")])
+        i = ODataQuery(count=True, filter=f, select=["displayName"], top=15)
+
+        self.assertEqual("?$count=true&$filter=city ne New-York&$select=displayName&$top=15", str(i))
+
+    def test_query_from_constructor_bad_value(self):
+        try:
+            ODataQuery(top="10")
+            self.fail()
+        except ValueError:
+            pass
+
+    def test_nested_changes_after_rendering(self):
+        i = self.get_instance()
+        constrain = Constrain("mail", LogicalOperator.EQ, "'a'")
+        i.filter = Filter([constrain])
+        self.assertEqual("?$filter=mail eq 'a'", str(i))
+
+        constrain.value = "'b'"
+        self.assertEqual("?$filter=mail eq 'b'", str(i))
+
+        i.filter.constrains = [constrain, Constrain("city", LogicalOperator.NE, "New-York")]
+        i.filter.logical_connector = LogicalConnector.OR
+        self.assertEqual("?$filter=mail eq 'b' or city ne New-York", str(i))
@@ -13,10 +13,24 @@ setuptools.setup(
     long_description_content_type="text/markdown",
     url="https://noamm91.github.io/msgraph-async",
     packages=setuptools.find_packages(),
+    install_requires=[
+        "aiohttp",
+        "orjson",
+    ],
+    extras_require={
+        "http2": ["httpx[http2]"],
+        "aiodns": ["aiodns"],
+    },
     classifiers=[
         "Programming Language :: Python :: 3",
+        "Programming Language :: Python :: 3 :: Only",
+        "Programming Language :: Python :: 3.7",
+        "Programming Language :: Python :: 3.8",
+        "Programming Language :: Python :: 3.9",
+        "Programming Language :: Python :: 3.10",
+        "Programming Language :: Python :: 3.11",
         "License :: OSI Approved :: MIT License",
         "Operating System :: OS Independent",
     ],
-    python_requires='>=3.6',
+    python_requires='>=3.7',
 )